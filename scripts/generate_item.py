@@ -1,15 +1,16 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import json
 import os
 import re
 import sys
+from datetime import date, timedelta
 from pathlib import Path
-from typing import Any, Dict, List
-from urllib import error, request
+from typing import Any, Dict, Iterable, List, Optional
+from urllib import request
 
-from topics import pick_for_today, resolve_topics
+import jsonio
+from topics import pick_for_date, resolve_topics
 
 CATEGORIES = ["Minimalismus", "Selbstentwicklung", "Frugalismus", "Investieren"]
 
@@ -17,30 +18,73 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 SCHEMA_PATH = REPO_ROOT / "data" / "schema.json"
 FALLBACK_PATH = REPO_ROOT / "data" / "fallback.json"
 ITEM_PATH = REPO_ROOT / "item.json"
+ITEMS_PATH = REPO_ROOT / "items.json"
 
 CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+# Upper bound for articles per request; longer batches risk running into the
+# model's output token limit and getting cut off mid-JSON.
+MAX_BATCH_SIZE = 7
+
+_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "Du schreibst inspirierende, deutschsprachige Kurzartikel. "
+        "Halte dich an die geforderten Wortzahlen und bleibe seriös."
+    ),
+}
+_USER_PROMPT_TPL = (
+    'Erzeuge {count} Artikel als JSON-Objekt {{ "items": [...] }}, '
+    "genau einen pro Thema in der angegebenen Reihenfolge. Jeder Artikel hat die Felder:\n"
+    '{{ "title": string, "body": string, "url": string, "category": string }}.\n'
+    "Sprache: Deutsch. Länge body: 150–200 Wörter.\n"
+    "Themen: {topics}.\n"
+    'Kategorie: eine aus ["Minimalismus","Selbstentwicklung","Frugalismus","Investieren"].\n'
+    'Am Ende des Textes keinen weiteren Call-to-Action; Link in "url".\n'
+    "Liefere ausschließlich ein JSON-Objekt ohne Kommentartext."
+)
+_PAYLOAD_TPL: Dict[str, Any] = {
+    "response_format": {"type": "json_object"},
+    "stream": True,
+}
 
 
 def load_schema() -> Dict[str, Any]:
-    with SCHEMA_PATH.open("r", encoding="utf-8") as schema_file:
-        return json.load(schema_file)
+    return jsonio.loads(SCHEMA_PATH.read_bytes())
 
 
 def load_fallback_items() -> List[Dict[str, Any]]:
-    with FALLBACK_PATH.open("r", encoding="utf-8") as fallback_file:
-        data = json.load(fallback_file)
+    data = jsonio.loads(FALLBACK_PATH.read_bytes())
     if not isinstance(data, list) or not data:
         raise ValueError("Fallback-Datei enthält keine Artikel.")
     return data
 
 
-def validate_item(item: Dict[str, Any], schema: Dict[str, Any]) -> None:
-    required = schema.get("required", [])
-    properties: Dict[str, Any] = schema.get("properties", {})
-    for field in required:
-        if field not in item:
-            raise ValueError(f"Antwort fehlt Feld '{field}'.")
-    for key, spec in properties.items():
+def load_queued_items() -> Dict[str, Dict[str, Any]]:
+    if not ITEMS_PATH.exists():
+        return {}
+    data = jsonio.loads(ITEMS_PATH.read_bytes())
+    if not isinstance(data, dict):
+        raise ValueError("items.json muss ein JSON-Objekt sein.")
+    return data
+
+
+SCHEMA = load_schema()
+_PROPERTIES: Dict[str, Any] = SCHEMA.get("properties", {})
+_REQUIRED = tuple(SCHEMA.get("required", []))
+_REQUIRED_SET = frozenset(_REQUIRED)
+_ALLOWED = frozenset(_PROPERTIES)
+_PATTERNS = {key: re.compile(spec["pattern"]) for key, spec in _PROPERTIES.items() if spec.get("pattern")}
+_ENUMS = {key: frozenset(spec["enum"]) for key, spec in _PROPERTIES.items() if spec.get("enum")}
+
+
+def validate_item(item: Dict[str, Any]) -> None:
+    if not isinstance(item, dict):
+        raise ValueError("Antwort muss ein JSON-Objekt sein.")
+    missing = _REQUIRED_SET - item.keys()
+    if missing:
+        field = next(field for field in _REQUIRED if field in missing)
+        raise ValueError(f"Antwort fehlt Feld '{field}'.")
+    for key, spec in _PROPERTIES.items():
         if key not in item:
             continue
         value = item[key]
@@ -54,9 +98,9 @@ def validate_item(item: Dict[str, Any], schema: Dict[str, Any]) -> None:
                 raise ValueError(f"Feld '{key}' unterschreitet Mindestlänge {min_len}.")
             if max_len is not None and len(value) > max_len:
                 raise ValueError(f"Feld '{key}' überschreitet Maximallänge {max_len}.")
-            pattern = spec.get("pattern")
-            if pattern and not re.match(pattern, value):
-                raise ValueError(f"Feld '{key}' erfüllt Muster '{pattern}' nicht.")
+            pattern = _PATTERNS.get(key)
+            if pattern is not None and not pattern.match(value):
+                raise ValueError(f"Feld '{key}' erfüllt Muster '{pattern.pattern}' nicht.")
             min_words = spec.get("minWords")
             max_words = spec.get("maxWords")
             if min_words or max_words:
@@ -65,96 +109,141 @@ def validate_item(item: Dict[str, Any], schema: Dict[str, Any]) -> None:
                     raise ValueError(f"Feld '{key}' benötigt mindestens {min_words} Wörter (aktuell {word_count}).")
                 if max_words and word_count > max_words:
                     raise ValueError(f"Feld '{key}' erlaubt höchstens {max_words} Wörter (aktuell {word_count}).")
-        enum_values = spec.get("enum")
-        if enum_values and value not in enum_values:
-            raise ValueError(f"Feld '{key}' muss einen Wert aus {enum_values} besitzen.")
-    for field in item:
-        if field not in properties:
-            raise ValueError(f"Unerwartetes Feld '{field}' in Antwort.")
+        enum_values = _ENUMS.get(key)
+        if enum_values is not None and value not in enum_values:
+            raise ValueError(f"Feld '{key}' muss einen Wert aus {spec['enum']} besitzen.")
+    extra = item.keys() - _ALLOWED
+    if extra:
+        raise ValueError(f"Unerwartete Felder in Antwort: {sorted(extra)}")
+
+
+def _read_event_stream(response: Iterable[bytes]) -> str:
+    parts: List[str] = []
+    for raw_line in response:
+        line = raw_line.strip()
+        if not line.startswith(b"data:"):
+            continue
+        data = line[len(b"data:"):].strip()
+        if data == b"[DONE]":
+            continue
+        choices = jsonio.loads(data).get("choices")
+        if not choices:
+            continue
+        content = choices[0].get("delta", {}).get("content")
+        if content:
+            parts.append(content)
+    if not parts:
+        raise ValueError("Antwort enthält keine Auswahl.")
+    return "".join(parts)
 
 
-def call_openai(api_key: str, model: str, topic: str) -> Dict[str, Any]:
-    system_prompt = (
-        "Du schreibst inspirierende, deutschsprachige Kurzartikel. "
-        "Halte dich an die geforderten Wortzahlen und bleibe seriös."
-    )
-    user_prompt = (
-        'Erzeuge EINEN Artikel als JSON mit Feldern:\n'
-        '{ "title": string, "body": string, "url": string, "category": string }.\n'
-        "Sprache: Deutsch. Länge body: 150–200 Wörter.\n"
-        f'Thema: "{topic}".\n'
-        'Kategorie: eine aus ["Minimalismus","Selbstentwicklung","Frugalismus","Investieren"].\n'
-        'Am Ende des Textes keinen weiteren Call-to-Action; Link in "url".\n'
-        "Liefere ausschließlich ein JSON-Objekt ohne Kommentartext."
-    )
-    payload = json.dumps(
-        {
-            "model": model,
-            "response_format": {"type": "json_object"},
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-        }
-    ).encode("utf-8")
+def stream_chat_completion(api_key: str, payload: bytes) -> str:
     http_request = request.Request(
         CHAT_COMPLETIONS_URL,
         data=payload,
         headers={
             "Content-Type": "application/json",
+            "Accept": "text/event-stream",
             "Authorization": f"Bearer {api_key}",
         },
         method="POST",
     )
+    # Only the streamed message deltas are kept; the response envelope is
+    # never buffered or parsed as a whole.
     with request.urlopen(http_request, timeout=60) as response:
-        body = response.read().decode("utf-8")
-    result = json.loads(body)
-    choices = result.get("choices")
-    if not choices:
-        raise ValueError("Antwort enthält keine Auswahl.")
-    content = choices[0]["message"]["content"]
-    return json.loads(content)
+        return _read_event_stream(response)
 
 
-def select_fallback(topic: str, fallback_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+def call_openai(api_key: str, model: str, topics: List[str]) -> List[Dict[str, Any]]:
+    user_prompt = _USER_PROMPT_TPL.format(count=len(topics), topics=jsonio.dumps(topics, indent=False).decode())
+    payload = jsonio.dumps(
+        {
+            **_PAYLOAD_TPL,
+            "model": model,
+            "messages": [_SYSTEM_MESSAGE, {"role": "user", "content": user_prompt}],
+        },
+        indent=False,
+    )
+    content = stream_chat_completion(api_key, payload)
+    result = jsonio.loads(content)
+    articles = result.get("items") if isinstance(result, dict) else None
+    if not isinstance(articles, list) or not articles:
+        raise ValueError("Antwort enthält keine Artikel.")
+    if len(articles) != len(topics):
+        print(f"[WARN] Antwort enthält {len(articles)} statt {len(topics)} Artikel.", file=sys.stderr)
+    return articles[: len(topics)]
+
+
+def select_fallback(topic: str, fallback_items: List[Dict[str, Any]], today: date) -> Dict[str, Any]:
     if not fallback_items:
         raise ValueError("Keine Fallback-Artikel verfügbar.")
-    checksum = sum(ord(char) for char in topic)
-    today_index = (checksum + os.getpid()) % len(fallback_items)
+    checksum = sum(topic.encode("utf-8"))
+    today_index = (checksum + today.toordinal()) % len(fallback_items)
     return fallback_items[today_index]
 
 
 def main() -> int:
-    schema = load_schema()
     fallback_items = load_fallback_items()
     topics = resolve_topics()
-    todays_topic = pick_for_today(topics)
+    # The date is taken once so topic, batch and fallback agree even if the
+    # run crosses midnight.
+    today = date.today()
+    today_key = today.isoformat()
+    todays_topic = pick_for_date(topics, today)
     api_key = os.getenv("OPENAI_API_KEY", "")
     model = os.getenv("MODEL", "gpt-4o-mini") or "gpt-4o-mini"
+    try:
+        queued_items = load_queued_items()
+    except Exception as exc:  # noqa: BLE001
+        print(f"[WARN] items.json konnte nicht gelesen werden: {exc}", file=sys.stderr)
+        queued_items = {}
+    queued_items = {day: entry for day, entry in queued_items.items() if day >= today_key}
+
+    item: Optional[Dict[str, Any]] = None
+    queued = queued_items.pop(today_key, None)
+    if isinstance(queued, dict) and queued.get("topic") == todays_topic:
+        try:
+            validate_item(queued.get("item"))
+        except ValueError as exc:
+            print(f"[WARN] Vorgehaltener Artikel für {today_key} ungültig: {exc}", file=sys.stderr)
+        else:
+            item = queued["item"]
 
-    item: Dict[str, Any]
     try:
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY fehlt.")
-        item = call_openai(api_key, model, todays_topic)
-        validate_item(item, schema)
+        if item is None:
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY fehlt.")
+            # One request covers the next days of the topic rotation; the
+            # articles for the following days are queued in items.json.
+            batch_size = min(len(topics), MAX_BATCH_SIZE)
+            days = [today + timedelta(days=offset) for offset in range(batch_size)]
+            batch_topics = [pick_for_date(topics, day) for day in days]
+            articles = call_openai(api_key, model, batch_topics)
+            for day, topic, article in zip(days[1:], batch_topics[1:], articles[1:]):
+                try:
+                    validate_item(article)
+                except ValueError as exc:
+                    print(f"[WARN] Artikel für {day.isoformat()} verworfen: {exc}", file=sys.stderr)
+                    continue
+                queued_items[day.isoformat()] = {"topic": topic, "item": article}
+            item = articles[0]
+            validate_item(item)
     except Exception as exc:  # noqa: BLE001
         print(f"[WARN] OpenAI-Generierung fehlgeschlagen: {exc}", file=sys.stderr)
-        item = select_fallback(todays_topic, fallback_items)
+        item = select_fallback(todays_topic, fallback_items, today)
         try:
-            validate_item(item, schema)
+            validate_item(item)
         except Exception as inner_exc:  # noqa: BLE001
             print(f"[ERROR] Fallback-Artikel ungültig: {inner_exc}", file=sys.stderr)
             return 1
 
-    item["title"] = item["title"].strip()
-    item["body"] = item["body"].strip()
-    item["url"] = item["url"].strip()
-    item["category"] = item["category"].strip()
+    ITEMS_PATH.write_bytes(jsonio.dumps(queued_items, sort_keys=True))
+
+    for field in ("title", "body", "url", "category"):
+        item[field] = item[field].strip()
     item["topic"] = todays_topic
 
-    with ITEM_PATH.open("w", encoding="utf-8") as item_file:
-        json.dump(item, item_file, ensure_ascii=False, indent=2)
+    ITEM_PATH.write_bytes(jsonio.dumps(item))
 
     print(f"[INFO] Artikel für Thema '{todays_topic}' erzeugt.")
     return 0
@@ -2,13 +2,15 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import List
+from functools import lru_cache
+from typing import Tuple
 import os
 
 DEFAULT_TOPICS_FALLBACK = "Minimalismus,Selbstentwicklung,Frugalismus,Investieren"
 
 
-def resolve_topics() -> List[str]:
+@lru_cache(maxsize=1)
+def resolve_topics() -> Tuple[str, ...]:
     """Parse topics from environment variables with graceful defaults."""
     raw_topics = os.getenv("TOPICS", "")
     if raw_topics:
@@ -19,15 +21,16 @@ def resolve_topics() -> List[str]:
     filtered = [topic for topic in candidates if topic]
     if not filtered:
         filtered = [topic.strip() for topic in DEFAULT_TOPICS_FALLBACK.split(",") if topic.strip()]
-    return filtered
+    return tuple(filtered)
 
 
-def pick_for_today(topics: List[str]) -> str:
-    """Return a deterministic topic based on the current date."""
+@lru_cache(maxsize=32)
+def pick_for_date(topics: Tuple[str, ...], day: date) -> str:
+    """Return a deterministic topic for the given date."""
     if not topics:
         raise ValueError("Topic list must not be empty.")
-    today = date.today()
     base = date(2025, 1, 1)
-    delta_days = (today - base).days
+    delta_days = (day - base).days
     index = delta_days % len(topics)
     return topics[index]
+
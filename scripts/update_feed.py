@@ -1,26 +1,37 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import json
+import hashlib
+import mmap
 import os
 import sys
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from email.utils import format_datetime
+from itertools import islice
 from pathlib import Path
 from typing import Dict, Optional
 from xml.etree import ElementTree as ET
 
+import jsonio
+
 CATEGORIES = ["Minimalismus", "Selbstentwicklung", "Frugalismus", "Investieren"]
 REPO_ROOT = Path(__file__).resolve().parents[1]
 FEED_PATH = REPO_ROOT / "feed.xml"
 ITEM_PATH = REPO_ROOT / "item.json"
 
 
+@dataclass(frozen=True, slots=True)
+class FeedDefaults:
+    title: str
+    link: str
+    description: str
+
+
 def load_item() -> Dict[str, str]:
     if not ITEM_PATH.exists():
         raise FileNotFoundError("item.json wurde nicht gefunden. Bitte zuerst generate_item ausführen.")
-    with ITEM_PATH.open("r", encoding="utf-8") as item_file:
-        data = json.load(item_file)
+    data = jsonio.load_path(ITEM_PATH)
     for field in ("title", "body", "url", "category"):
         if field not in data:
             raise ValueError(f"item.json fehlt Feld '{field}'.")
@@ -29,21 +40,7 @@ def load_item() -> Dict[str, str]:
     return data
 
 
-def indent(element: ET.Element, level: int = 0) -> None:
-    spacing = "\n" + "  " * level
-    if len(element):
-        if not element.text or not element.text.strip():
-            element.text = spacing + "  "
-        for child in element:
-            indent(child, level + 1)
-        if not element.tail or not element.tail.strip():
-            element.tail = spacing
-    else:
-        if level and (not element.tail or not element.tail.strip()):
-            element.tail = spacing
-
-
-def ensure_channel(tree: ET.ElementTree, defaults: Dict[str, str]) -> ET.Element:
+def ensure_channel(tree: ET.ElementTree, defaults: FeedDefaults, now: datetime) -> ET.Element:
     root = tree.getroot()
     if root.tag != "rss":
         raise ValueError("feed.xml besitzt kein <rss>-Root.")
@@ -51,9 +48,9 @@ def ensure_channel(tree: ET.ElementTree, defaults: Dict[str, str]) -> ET.Element
     if channel is None:
         channel = ET.SubElement(root, "channel")
     for tag, text in (
-        ("title", defaults["title"]),
-        ("link", defaults["link"]),
-        ("description", defaults["description"]),
+        ("title", defaults.title),
+        ("link", defaults.link),
+        ("description", defaults.description),
         ("language", "de-de"),
     ):
         node = channel.find(tag)
@@ -61,22 +58,20 @@ def ensure_channel(tree: ET.ElementTree, defaults: Dict[str, str]) -> ET.Element
             node = ET.SubElement(channel, tag)
         node.text = text
     last_build = channel.find("lastBuildDate")
-    now_formatted = format_datetime(datetime.now(timezone.utc))
+    now_formatted = format_datetime(now)
     if last_build is None:
         last_build = ET.SubElement(channel, "lastBuildDate")
     last_build.text = now_formatted
     return channel
 
 
-def create_new_feed(defaults: Dict[str, str]) -> ET.ElementTree:
+def create_new_feed() -> ET.ElementTree:
+    # The channel and its metadata are filled in by ensure_channel.
     rss = ET.Element("rss", attrib={"version": "2.0"})
-    tree = ET.ElementTree(rss)
-    ensure_channel(tree, defaults)
-    return tree
+    return ET.ElementTree(rss)
 
 
-def build_item_element(item: Dict[str, str]) -> ET.Element:
-    now = datetime.now(timezone.utc)
+def build_item_element(item: Dict[str, str], now: datetime) -> ET.Element:
     item_element = ET.Element("item")
     title = ET.SubElement(item_element, "title")
     title.text = item["title"]
@@ -91,7 +86,8 @@ def build_item_element(item: Dict[str, str]) -> ET.Element:
     category.text = item["category"]
 
     guid = ET.SubElement(item_element, "guid", attrib={"isPermaLink": "false"})
-    guid.text = f"{now.timestamp():.0f}-{abs(hash(item['title']))}"
+    title_digest = hashlib.blake2b(item["title"].encode("utf-8"), digest_size=8).hexdigest()
+    guid.text = f"{int(now.timestamp())}-{title_digest}"
 
     pub_date = ET.SubElement(item_element, "pubDate")
     pub_date.text = format_datetime(now)
@@ -99,14 +95,37 @@ def build_item_element(item: Dict[str, str]) -> ET.Element:
     return item_element
 
 
-def read_feed(defaults: Dict[str, str]) -> ET.ElementTree:
+def read_feed(max_items: int) -> ET.ElementTree:
     if not FEED_PATH.exists():
-        return create_new_feed(defaults)
-    tree = ET.parse(FEED_PATH)
-    return tree
-
-
-def get_feed_defaults() -> Dict[str, str]:
+        return create_new_feed()
+    # Room for the new item is kept free, so older items beyond the cap are
+    # dropped while parsing instead of being trimmed after the fact.
+    keep_items = max_items - 1
+    root: Optional[ET.Element] = None
+    channel: Optional[ET.Element] = None
+    depth = 0
+    item_count = 0
+    with FEED_PATH.open("rb") as feed_file, mmap.mmap(feed_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        # The parser pulls chunks through mapped.read(), so the file is paged
+        # in on demand instead of being copied into one bytes object first.
+        for event, element in ET.iterparse(mapped, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = element
+                elif depth == 2 and channel is None and element.tag == "channel":
+                    channel = element
+                continue
+            depth -= 1
+            if depth == 2 and channel is not None and element.tag == "item":
+                item_count += 1
+                if item_count > keep_items:
+                    channel.remove(element)
+                    element.clear()
+    return ET.ElementTree(root)
+
+
+def _load_defaults() -> FeedDefaults:
     feed_title = os.getenv("FEED_TITLE", "").strip() or "Personal Development Feed (DE)"
     feed_link_env = os.getenv("FEED_LINK", "").strip()
     feed_description = os.getenv("FEED_DESC", "").strip() or "Tägliche Nuggets mit Link zum Weiterlesen."
@@ -120,11 +139,18 @@ def get_feed_defaults() -> Dict[str, str]:
             feed_link = f"https://{owner}.github.io/{repo}/feed.xml"
         else:
             feed_link = "https://example.com/feed.xml"
-    return {
-        "title": feed_title,
-        "link": feed_link,
-        "description": feed_description,
-    }
+    return FeedDefaults(
+        title=feed_title,
+        link=feed_link,
+        description=feed_description,
+    )
+
+
+_DEFAULTS = _load_defaults()
+
+
+def get_feed_defaults() -> FeedDefaults:
+    return _DEFAULTS
 
 
 def parse_max_items() -> int:
@@ -145,28 +171,31 @@ def main() -> int:
         print(f"[ERROR] {exc}", file=sys.stderr)
         return 1
 
-    defaults = get_feed_defaults()
     try:
-        feed_tree = read_feed(defaults)
+        max_items = parse_max_items()
+    except ValueError as exc:
+        print(f"[ERROR] {exc}", file=sys.stderr)
+        return 1
+
+    try:
+        feed_tree = read_feed(max_items)
     except Exception as exc:  # noqa: BLE001
         print(f"[ERROR] feed.xml konnte nicht gelesen werden: {exc}", file=sys.stderr)
         return 1
 
-    channel = ensure_channel(feed_tree, defaults)
-    new_item = build_item_element(item)
+    # One timestamp for the whole run keeps lastBuildDate and the new item's
+    # pubDate in sync.
+    now = datetime.now(timezone.utc)
+    channel = ensure_channel(feed_tree, get_feed_defaults(), now)
+    new_item = build_item_element(item, now)
     channel.insert(0, new_item)
 
-    try:
-        max_items = parse_max_items()
-    except ValueError as exc:
-        print(f"[ERROR] {exc}", file=sys.stderr)
-        return 1
-
-    existing_items = channel.findall("item")
-    for extra in existing_items[max_items:]:
+    # read_feed already caps the parsed items, so this is only a safety net.
+    extra_items = list(islice(channel.iterfind("item"), max_items, None))
+    for extra in extra_items:
         channel.remove(extra)
 
-    indent(feed_tree.getroot())
+    ET.indent(feed_tree, space="  ")
     feed_tree.write(FEED_PATH, encoding="utf-8", xml_declaration=True)
     print(f"[INFO] feed.xml aktualisiert (max {max_items} Einträge).")
     return 0